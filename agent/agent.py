@@ -5,14 +5,25 @@ Autonomous agent for monitoring and validating AI outputs
 """
 
 import asyncio
+import base64
 import aiohttp
-import json
-import hashlib
-from typing import List, Dict, Optional
+from aiohttp import web
+import orjson
+import os
+import functools
+import threading
+from collections import OrderedDict
+from operator import attrgetter
+from typing import List, Dict, Optional, Tuple, Union
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timezone
+from time import monotonic
+import faiss
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+import xxhash
+import simsimd
+from numba import njit
+import torch
 from sentence_transformers import SentenceTransformer
 
 # ==================== Configuration ====================
@@ -20,15 +31,30 @@ API_BASE_URL = "http://localhost:3000"
 VALIDATION_THRESHOLD = 70  # Minimum trust score
 MIN_WORKERS = 3
 SIMILARITY_THRESHOLD = 0.75
+WORKER_WAIT_TIMEOUT = 2  # Seconds to wait when no completion webhook arrives
+WEBHOOK_PATH = "/webhook/worker-complete"
+WEBHOOK_HOST = "127.0.0.1"
+WEBHOOK_PORT = None  # Port for worker completion webhooks (opt-in, e.g. 8080)
+EARLY_COMPLETION_TTL = 60  # Seconds to remember a completion that beat its waiter
+EARLY_COMPLETION_MAX = 1024  # Max remembered early completions
+MAX_CONNECTIONS_PER_HOST = 32
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+EMBEDDER_BACKEND = "bettertransformer"  # "bettertransformer" (fused attention) or "int8"
+EMBEDDING_CACHE_SIZE = 4096  # Max cached response embeddings (LRU)
+EMBEDDING_BATCH_SIZE = 32
+PROMPT_CACHE_SIZE = 1024  # Max cached validation results (LRU)
+PROMPT_CACHE_THRESHOLD = 0.95  # Cosine similarity for a semantic cache hit
+PROMPT_CACHE_TTL = 300  # Seconds a cached validation result stays valid
+HISTORY_LOG_PATH = "validation_history.jsonl"  # Append-only log shared across runs
 
 # ==================== Data Models ====================
-@dataclass
+@dataclass(slots=True)
 class ValidationRequest:
     prompt: str
     model: Optional[str] = "gpt-4"
     min_workers: int = MIN_WORKERS
 
-@dataclass
+@dataclass(slots=True)
 class WorkerResponse:
     worker: str
     response: str
@@ -36,7 +62,7 @@ class WorkerResponse:
     inference_time_ms: int
     similarity_score: float = 0.0
 
-@dataclass
+@dataclass(slots=True)
 class TrustScore:
     score: int
     consensus_reached: bool
@@ -44,29 +70,189 @@ class TrustScore:
     avg_similarity: float
     evidence_cid: str
 
+# Evidence bundle serialization of WorkerResponse
+EVIDENCE_RESPONSE_KEYS = ('worker', 'responseHash', 'inferenceTimeMs', 'similarityScore')
+_evidence_fields = attrgetter('worker', 'response_hash', 'inference_time_ms', 'similarity_score')
+
+# ==================== Timestamps ====================
+def _utc_timestamp() -> str:
+    """UTC ISO-8601 timestamp with millisecond precision"""
+    return datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+
+# ==================== Hashing ====================
+def _hash(text: str) -> str:
+    """
+    Non-cryptographic content hash for local cache keys
+    Evidence integrity is bound by the SHA-256 responseHash and IPFS CID
+    """
+    return xxhash.xxh3_128_hexdigest(text.encode())
+
+# ==================== Embedding Model ====================
+# The shared encoder's fast tokenizer is not thread-safe ("Already borrowed")
+_EMBEDDER_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _get_embedder(name: str = EMBEDDING_MODEL) -> SentenceTransformer:
+    """Shared encoder instance, read-only at inference so safe across agents"""
+    return _load_embedder(name)
+
+def _available_cpus() -> int:
+    """CPUs this process may run on (respects affinity / container cpusets)"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+def _load_embedder(
+    name: str = EMBEDDING_MODEL,
+    backend: str = EMBEDDER_BACKEND
+) -> SentenceTransformer:
+    """
+    Load the sentence encoder for CPU inference
+    Backends (mutually exclusive, both rewrite the encoder layers):
+    - bettertransformer: fused SDPA attention with padding removal,
+      falls back to int8 if the conversion is unsupported
+    - int8: dynamic quantization of Linear layers (VNNI on AVX-512 CPUs)
+    """
+    if backend not in ("bettertransformer", "int8"):
+        raise ValueError(f"Unknown embedder backend: {backend}")
+    
+    torch.set_num_threads(_available_cpus())
+    model = SentenceTransformer(name, device="cpu")
+    
+    if backend == "bettertransformer":
+        transformer = model._first_module()
+        try:
+            transformer.auto_model = transformer.auto_model.to_bettertransformer()
+            return model
+        except (ImportError, AttributeError, ValueError, NotImplementedError, RuntimeError) as e:
+            # optimum missing, or the installed transformers is unsupported
+            print(f"⚠️ BetterTransformer unavailable ({e}), using int8 encoder")
+    
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+# ==================== Scoring Kernels ====================
+@njit(cache=True)
+def _consensus_score_kernel(
+    sim: np.ndarray,
+    mask: np.ndarray,
+    times: np.ndarray
+) -> int:
+    """
+    Native trust score core (see calculate_consensus_score)
+    sim: NxN float32, mask: N bool (True = valid), times: N float64
+    """
+    n = mask.shape[0]
+    k = 0
+    time_sum = 0.0
+    sim_sum = 0.0
+    for i in range(n):
+        if mask[i]:
+            k += 1
+            time_sum += times[i]
+            for j in range(n):
+                if mask[j]:
+                    sim_sum += sim[i, j]
+    
+    if k == 0:
+        return 0
+    
+    # Semantic similarity score (0-60 points)
+    avg_similarity = sim_sum / (k * k)
+    similarity_score = min(60, int(avg_similarity * 60))
+    
+    # Consensus ratio (0-20 points)
+    consensus_score = int(k / n * 20)
+    
+    # Response time consistency (0-10 points)
+    time_mean = time_sum / k
+    time_var = 0.0
+    for i in range(n):
+        if mask[i]:
+            time_var += (times[i] - time_mean) ** 2
+    time_std = np.sqrt(time_var / k)
+    time_cv = time_std / time_mean if time_mean > 0 else 1.0
+    time_score = max(0, int(10 * (1 - time_cv)))
+    
+    # Worker reputation bonus (0-10 points)
+    reputation_score = 10  # Simplified, query from blockchain in production
+    
+    total_score = similarity_score + consensus_score + time_score + reputation_score
+    return min(100, total_score)
+
+# Compile (or load from cache) at import so the first validation is not penalized
+_consensus_score_kernel(
+    np.ones((1, 1), dtype=np.float32),
+    np.ones(1, dtype=np.bool_),
+    np.ones(1, dtype=np.float64),
+)
+
 # ==================== Agent Core ====================
 class CortensorValidationAgent:
     """Agentic assistant for autonomous validation"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        webhook_port: Optional[int] = WEBHOOK_PORT,
+        history_log_path: Optional[str] = HISTORY_LOG_PATH
+    ):
         self.session: Optional[aiohttp.ClientSession] = None
-        self.embedder = SentenceTransformer('all-MiniLM-L6-v2')
+        self.history_log_path = history_log_path
+        self.webhook_port = webhook_port
+        self._webhook_runner: Optional[web.AppRunner] = None
+        self.embedder = _get_embedder()
         self.validation_history: List[Dict] = []
+        self._hist_fp = None
+        self._emb_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._prompt_index = faiss.IndexIDMap2(
+            faiss.IndexFlatIP(self.embedder.get_sentence_embedding_dimension())
+        )
+        self._prompt_scores: "OrderedDict[int, Tuple[float, str, TrustScore]]" = OrderedDict()
+        self._next_prompt_id = 0
+        self._pending: Dict[str, asyncio.Event] = {}
+        self._early_completions: "OrderedDict[str, float]" = OrderedDict()
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        # __aexit__ does not run if __aenter__ raises, so clean up here
+        try:
+            if self.webhook_port is not None:
+                self._webhook_runner = web.AppRunner(self.create_webhook_app())
+                await self._webhook_runner.setup()
+                await web.TCPSite(self._webhook_runner, WEBHOOK_HOST, self.webhook_port).start()
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit_per_host=MAX_CONNECTIONS_PER_HOST,
+                    ttl_dns_cache=300,
+                )
+            )
+            if self.history_log_path is not None:
+                # Unbuffered O_APPEND: each record lands in a single write() call,
+                # so agents sharing the log never interleave partial lines
+                self._hist_fp = open(self.history_log_path, 'ab', buffering=0)
+        except BaseException:
+            await self.__aexit__(None, None, None)
+            raise
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._webhook_runner:
+            await self._webhook_runner.cleanup()
+            self._webhook_runner = None
         if self.session:
             await self.session.close()
+            self.session = None
+        if self._hist_fp:
+            self._hist_fp.close()
+            self._hist_fp = None
     
     # ==================== Main Validation Flow ====================
     
     async def validate_output(
         self, 
         prompt: str,
-        expected_format: Optional[str] = None
+        expected_format: Optional[str] = None,
+        use_cache: bool = False
     ) -> TrustScore:
         """
         Main validation pipeline:
@@ -75,32 +261,178 @@ class CortensorValidationAgent:
         3. Detect outliers
         4. Compute trust score
         5. Generate evidence bundle
+        With use_cache, a semantically equivalent prompt validated within
+        PROMPT_CACHE_TTL reuses its trust score (recorded as cached)
         """
         print(f"\n🔍 Starting validation for: {prompt[:50]}...")
         
-        # Step 1: Request inference
-        validation_id = await self._request_inference(prompt)
-        print(f"✅ Validation ID: {validation_id}")
+        cached = None
+        if use_cache:
+            # Encoder forward pass is blocking, keep it off the event loop
+            prompt_embedding = await asyncio.to_thread(self._encode_prompt, prompt)
+            cached = self._lookup_prompt(prompt_embedding)
         
-        # Step 2: Wait for workers to respond (in production, use webhooks)
-        await asyncio.sleep(2)
+        if cached is not None:
+            validation_id, trust_score = cached
+            print(f"♻️ Semantic cache hit: {validation_id}")
+        else:
+            # Step 1: Request inference
+            validation_id = await self._request_inference(prompt)
+            print(f"✅ Validation ID: {validation_id}")
+            
+            # Step 2: Wait for workers to respond (webhook or timeout)
+            await self._wait_for_workers(validation_id)
+            
+            # Step 3: Compute trust score
+            trust_score = await self._compute_trust_score(validation_id)
+            if use_cache:
+                self._remember_prompt(prompt_embedding, validation_id, trust_score)
         
-        # Step 3: Compute trust score
-        trust_score = await self._compute_trust_score(validation_id)
         print(f"📊 Trust Score: {trust_score.score}/100")
         print(f"✓ Consensus: {'Yes' if trust_score.consensus_reached else 'No'}")
         print(f"🔗 Evidence: ipfs://{trust_score.evidence_cid}")
         
         # Step 4: Store in history
-        self.validation_history.append({
-            'timestamp': datetime.now().isoformat(),
+        self._record_history(
+            prompt, validation_id, trust_score, _utc_timestamp(),
+            cached=cached is not None,
+        )
+        
+        return trust_score
+    
+    async def validate_batch(
+        self,
+        prompts: List[str]
+    ) -> List[Optional[TrustScore]]:
+        """
+        Batch validation pipeline:
+        All /infer requests are issued concurrently, then all /validate
+        requests, overlapping network latency across prompts
+        Does not consult the semantic cache (see validate_output use_cache)
+        Returns: trust scores aligned with prompts, None where a request failed
+        """
+        print(f"\n🔍 Starting batch validation for {len(prompts)} prompts...")
+        
+        validation_ids = await asyncio.gather(
+            *[self._request_inference(p) for p in prompts],
+            return_exceptions=True,
+        )
+        started = []
+        for i, v in enumerate(validation_ids):
+            if isinstance(v, BaseException):
+                print(f"❌ Inference request failed for: {prompts[i][:50]}... ({v!r})")
+            else:
+                started.append(i)
+        await asyncio.gather(
+            *[self._wait_for_workers(validation_ids[i]) for i in started]
+        )
+        scores = await asyncio.gather(
+            *[self._compute_trust_score(validation_ids[i]) for i in started],
+            return_exceptions=True,
+        )
+        
+        trust_scores: List[Optional[TrustScore]] = [None] * len(prompts)
+        timestamp = _utc_timestamp()
+        for i, score in zip(started, scores):
+            if isinstance(score, BaseException):
+                print(f"❌ Trust score failed for {validation_ids[i]}: {score!r}")
+                continue
+            trust_scores[i] = score
+            self._record_history(prompts[i], validation_ids[i], score, timestamp)
+        
+        completed = [t for t in trust_scores if t is not None]
+        consensus_count = sum(t.consensus_reached for t in completed)
+        print(f"📊 Consensus reached: {consensus_count}/{len(prompts)}")
+        if len(completed) < len(prompts):
+            print(f"⚠️ {len(prompts) - len(completed)} validations failed")
+        
+        return trust_scores
+    
+    def _record_history(
+        self,
+        prompt: str,
+        validation_id: str,
+        trust_score: TrustScore,
+        timestamp: str,
+        cached: bool = False
+    ):
+        """Append a validation result to history and the on-disk log"""
+        record = {
+            'timestamp': timestamp,
             'prompt': prompt,
             'validation_id': validation_id,
             'trust_score': trust_score.score,
             'consensus': trust_score.consensus_reached,
-        })
+            'cached': cached,
+        }
+        self.validation_history.append(record)
+        if self._hist_fp:
+            self._hist_fp.write(orjson.dumps(record) + b"\n")
+    
+    # ==================== Semantic Cache ====================
+    
+    def _encode_prompt(self, prompt: str) -> np.ndarray:
+        """Normalized prompt embedding, shaped (1, dim) for FAISS"""
+        with _EMBEDDER_LOCK:
+            embedding = self.embedder.encode(
+                [prompt], convert_to_numpy=True, normalize_embeddings=True
+            )
+        return embedding.astype(np.float32)
+    
+    def _lookup_prompt(
+        self,
+        prompt_embedding: np.ndarray
+    ) -> Optional[Tuple[str, TrustScore]]:
+        """Return (validation_id, trust_score) of an equivalent recent prompt"""
+        # Evict expired entries first so they cannot shadow a fresh match
+        self._purge_expired_prompts()
+        if self._prompt_index.ntotal == 0:
+            return None
         
-        return trust_score
+        D, I = self._prompt_index.search(prompt_embedding, 1)
+        if D[0, 0] < PROMPT_CACHE_THRESHOLD:
+            return None
+        
+        prompt_id = int(I[0, 0])
+        _, validation_id, trust_score = self._prompt_scores[prompt_id]
+        self._prompt_scores.move_to_end(prompt_id)
+        return validation_id, trust_score
+    
+    def _remember_prompt(
+        self,
+        prompt_embedding: np.ndarray,
+        validation_id: str,
+        trust_score: TrustScore
+    ):
+        """Add a validated prompt to the cache, evicting the LRU entry"""
+        prompt_id = self._next_prompt_id
+        self._next_prompt_id += 1
+        self._prompt_index.add_with_ids(
+            prompt_embedding, np.array([prompt_id], dtype=np.int64)
+        )
+        self._prompt_scores[prompt_id] = (monotonic(), validation_id, trust_score)
+        
+        while len(self._prompt_scores) > PROMPT_CACHE_SIZE:
+            self._forget_prompt(next(iter(self._prompt_scores)))
+    
+    def _purge_expired_prompts(self):
+        """Drop cached prompts older than PROMPT_CACHE_TTL"""
+        now = monotonic()
+        expired = [
+            prompt_id for prompt_id, (cached_at, _, _) in self._prompt_scores.items()
+            if now - cached_at > PROMPT_CACHE_TTL
+        ]
+        for prompt_id in expired:
+            del self._prompt_scores[prompt_id]
+        if expired:
+            self._prompt_index.remove_ids(np.array(expired, dtype=np.int64))
+    
+    def _forget_prompt(self, prompt_id: int):
+        """Drop a cached prompt from the index and score table"""
+        del self._prompt_scores[prompt_id]
+        self._prompt_index.remove_ids(np.array([prompt_id], dtype=np.int64))
+    
+    # ==================== Worker API ====================
     
     async def _request_inference(self, prompt: str) -> str:
         """Request inference from multiple workers (PoI)"""
@@ -108,16 +440,71 @@ class CortensorValidationAgent:
             f"{API_BASE_URL}/infer",
             json={"prompt": prompt}
         ) as resp:
-            data = await resp.json()
+            data = orjson.loads(await resp.read())
             return data['validationId']
     
+    async def _wait_for_workers(self, validation_id: str):
+        """Block until the completion webhook fires or the timeout elapses"""
+        completed_at = self._early_completions.pop(validation_id, None)
+        if completed_at is not None and monotonic() - completed_at <= EARLY_COMPLETION_TTL:
+            return
+        
+        event = self._pending.setdefault(validation_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=WORKER_WAIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._pending.pop(validation_id, None)
+    
+    async def on_worker_complete(self, validation_id: str) -> bool:
+        """
+        Signal that all workers have responded for a validation
+        Returns True if a waiting validation was woken. Completions that
+        arrive before the wait starts (e.g. while /infer is still being
+        read, or during validate_batch) are remembered for
+        EARLY_COMPLETION_TTL, bounded to EARLY_COMPLETION_MAX entries
+        """
+        event = self._pending.get(validation_id)
+        if event is not None:
+            event.set()
+            return True
+        
+        now = monotonic()
+        self._early_completions[validation_id] = now
+        self._early_completions.move_to_end(validation_id)
+        while self._early_completions and (
+            len(self._early_completions) > EARLY_COMPLETION_MAX
+            or now - next(iter(self._early_completions.values())) > EARLY_COMPLETION_TTL
+        ):
+            self._early_completions.popitem(last=False)
+        return False
+    
+    def create_webhook_app(self) -> web.Application:
+        """aiohttp app receiving worker completion webhooks (served in __aenter__)"""
+        async def handle_worker_complete(request: web.Request) -> web.Response:
+            try:
+                data = await request.json()
+                validation_id = data['validationId']
+            except (ValueError, KeyError, TypeError):
+                return web.json_response({"error": "validationId required"}, status=400)
+            if not isinstance(validation_id, str):
+                return web.json_response({"error": "validationId must be a string"}, status=400)
+            
+            received = await self.on_worker_complete(validation_id)
+            return web.json_response({"received": received})
+        
+        app = web.Application()
+        app.router.add_post(WEBHOOK_PATH, handle_worker_complete)
+        return app
+    
     async def _compute_trust_score(self, validation_id: str) -> TrustScore:
         """Compute trust score using PoUW"""
         async with self.session.post(
             f"{API_BASE_URL}/validate",
             json={"validationId": validation_id}
         ) as resp:
-            data = await resp.json()
+            data = orjson.loads(await resp.read())
             return TrustScore(
                 score=data['trustScore'],
                 consensus_reached=data['consensusReached'],
@@ -130,41 +517,88 @@ class CortensorValidationAgent:
     
     def calculate_semantic_similarity(
         self, 
-        responses: List[str]
+        responses: List[str],
+        response_hashes: Optional[List[str]] = None
     ) -> np.ndarray:
         """
         Calculate semantic similarity using sentence embeddings
+        Embeddings are cached by content hash, only new responses are encoded
         Returns: NxN similarity matrix
         """
-        embeddings = self.embedder.encode(responses)
-        similarity_matrix = cosine_similarity(embeddings)
+        # Identical responses (deterministic prompts) need no embedding:
+        # perfect similarity, zero spread, so no outliers downstream
+        if len(set(response_hashes or responses)) == 1:
+            n = len(responses)
+            return np.ones((n, n), dtype=np.float32)
+        
+        # f16 embeddings halve bandwidth for SimSIMD's fused dot+norm kernels
+        embeddings = self._embed(responses, response_hashes)
+        distances = simsimd.cdist(embeddings, embeddings, metric='cosine')
+        similarity_matrix = 1 - np.asarray(distances, dtype=np.float32)
         return similarity_matrix
     
+    def _embed(
+        self,
+        responses: List[str],
+        response_hashes: Optional[List[str]] = None
+    ) -> np.ndarray:
+        """Encode responses through the LRU embedding cache"""
+        keys = response_hashes or [
+            _hash(r) for r in responses
+        ]
+        miss_idx = [i for i, k in enumerate(keys) if k not in self._emb_cache]
+        
+        if miss_idx:
+            # encode() length-sorts its input before batching internally
+            with _EMBEDDER_LOCK:
+                new = self.embedder.encode(
+                    [responses[i] for i in miss_idx],
+                    batch_size=EMBEDDING_BATCH_SIZE,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                )
+            # Keep f16 copies, the similarity kernel consumes f16 anyway
+            for i, emb in zip(miss_idx, new.astype(np.float16)):
+                self._emb_cache[keys[i]] = emb
+        
+        embeddings = np.stack([self._emb_cache[k] for k in keys])
+        
+        # Refresh recency, then evict least recently used entries
+        for k in keys:
+            self._emb_cache.move_to_end(k)
+        while len(self._emb_cache) > EMBEDDING_CACHE_SIZE:
+            self._emb_cache.popitem(last=False)
+        
+        return embeddings
+    
     def detect_outliers(
         self, 
         similarity_matrix: np.ndarray,
         threshold: float = SIMILARITY_THRESHOLD
-    ) -> List[bool]:
+    ) -> np.ndarray:
         """
         Detect outlier responses based on similarity
         Returns: Boolean array indicating outliers
         """
-        n = len(similarity_matrix)
         avg_similarities = similarity_matrix.mean(axis=1)
-        mean_similarity = avg_similarities.mean()
+        deviations = np.abs(avg_similarities - avg_similarities.mean())
         std_similarity = avg_similarities.std()
         
-        # Z-score based outlier detection
-        z_scores = np.abs((avg_similarities - mean_similarity) / std_similarity)
+        # Z-score based outlier detection (zero spread means no outliers)
+        z_scores = np.divide(
+            deviations, std_similarity,
+            out=np.zeros_like(deviations),
+            where=std_similarity > 0,
+        )
         outliers = z_scores > 2.0  # 2 standard deviations
         
-        return outliers.tolist()
+        return outliers
     
     def calculate_consensus_score(
         self,
         responses: List[WorkerResponse],
         similarity_matrix: np.ndarray,
-        outlier_flags: List[bool]
+        outlier_flags: Union[np.ndarray, List[bool]]
     ) -> int:
         """
         Calculate weighted trust score (0-100)
@@ -174,33 +608,23 @@ class CortensorValidationAgent:
         - Response time consistency
         - Worker reputation (from blockchain)
         """
-        # Filter out outliers
-        valid_indices = [i for i, is_outlier in enumerate(outlier_flags) if not is_outlier]
-        
-        if not valid_indices:
-            return 0
-        
-        # Semantic similarity score (0-60 points)
-        valid_similarities = similarity_matrix[np.ix_(valid_indices, valid_indices)]
-        avg_similarity = valid_similarities.mean()
-        similarity_score = min(60, int(avg_similarity * 60))
-        
-        # Consensus ratio (0-20 points)
-        consensus_ratio = len(valid_indices) / len(responses)
-        consensus_score = int(consensus_ratio * 20)
-        
-        # Response time consistency (0-10 points)
-        valid_times = [responses[i].inference_time_ms for i in valid_indices]
-        time_std = np.std(valid_times)
-        time_mean = np.mean(valid_times)
-        time_cv = time_std / time_mean if time_mean > 0 else 1
-        time_score = max(0, int(10 * (1 - time_cv)))
-        
-        # Worker reputation bonus (0-10 points)
-        reputation_score = 10  # Simplified, query from blockchain in production
+        outlier_flags = np.asarray(outlier_flags, dtype=bool)
+        n = len(responses)
+        # The njit kernel does not bounds-check, validate shapes up front
+        if similarity_matrix.shape != (n, n) or outlier_flags.shape != (n,):
+            raise ValueError(
+                f"Shape mismatch: {n} responses, similarity matrix "
+                f"{similarity_matrix.shape}, outlier flags {outlier_flags.shape}"
+            )
         
-        total_score = similarity_score + consensus_score + time_score + reputation_score
-        return min(100, total_score)
+        times = np.fromiter(
+            (r.inference_time_ms for r in responses), dtype=np.float64, count=len(responses)
+        )
+        return _consensus_score_kernel(
+            np.ascontiguousarray(similarity_matrix, dtype=np.float32),
+            np.ascontiguousarray(~outlier_flags),
+            times,
+        )
     
     # ==================== Monitoring & Alerting ====================
     
@@ -238,12 +662,12 @@ class CortensorValidationAgent:
         """
         print(f"📄 Validating research document: {document_path}")
         
-        # Read document
-        with open(document_path, 'r') as f:
-            content = f.read()
+        # Read only the 500-character prefix used in the prompt
+        with open(document_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read(500)
         
         # Generate validation prompt
-        prompt = f"Provide a concise summary of this research: {content[:500]}..."
+        prompt = f"Provide a concise summary of this research: {content}..."
         
         # Validate
         return await self.validate_output(prompt)
@@ -264,36 +688,38 @@ class CortensorValidationAgent:
         validation_id: str,
         responses: List[WorkerResponse],
         similarity_matrix: np.ndarray,
-        outlier_flags: List[bool],
-        trust_score: int
+        outlier_flags: Union[np.ndarray, List[bool]],
+        trust_score: int,
+        timestamp: Optional[str] = None
     ) -> Dict:
         """
         Generate machine-verifiable evidence bundle
         ERC-8004 compatible format
+        Pass timestamp to share one with the matching history record
+        
+        Version 2.0.0: proofOfUsefulWork.semanticSimilarityMatrix is
+        {"dtype": "f16", "shape": [N, N], "data": <base64>}, where data is
+        the little-endian, row-major float16 buffer (1.0.0 used number[][])
         """
+        outlier_flags = np.asarray(outlier_flags, dtype=bool)
         return {
-            "version": "1.0.0",
+            "version": "2.0.0",
             "validationId": validation_id,
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": timestamp or _utc_timestamp(),
             "trustScore": trust_score,
             "consensusReached": trust_score >= VALIDATION_THRESHOLD,
             "proofOfInference": {
                 "workerCount": len(responses),
                 "responses": [
-                    {
-                        "worker": r.worker,
-                        "responseHash": r.response_hash,
-                        "inferenceTimeMs": r.inference_time_ms,
-                        "similarityScore": r.similarity_score,
-                    }
+                    dict(zip(EVIDENCE_RESPONSE_KEYS, _evidence_fields(r)))
                     for r in responses
                 ],
             },
             "proofOfUsefulWork": {
-                "semanticSimilarityMatrix": similarity_matrix.tolist(),
-                "outlierFlags": outlier_flags,
+                "semanticSimilarityMatrix": self._encode_matrix(similarity_matrix),
+                "outlierFlags": outlier_flags.tolist(),
                 "avgSimilarity": float(similarity_matrix.mean()),
-                "outlierCount": sum(outlier_flags),
+                "outlierCount": int(outlier_flags.sum()),
             },
             "verification": {
                 "method": "cortensor-poi-pouw",
@@ -302,6 +728,16 @@ class CortensorValidationAgent:
             },
         }
     
+    @staticmethod
+    def _encode_matrix(matrix: np.ndarray) -> Dict:
+        """Pack a matrix as base64 float16 (little-endian, row-major)"""
+        m16 = np.ascontiguousarray(matrix, dtype='<f2')
+        return {
+            "dtype": "f16",
+            "shape": list(m16.shape),
+            "data": base64.b64encode(m16.tobytes()).decode(),
+        }
+    
     # ==================== Utilities ====================
     
     def get_validation_history(self) -> List[Dict]:
@@ -309,9 +745,24 @@ class CortensorValidationAgent:
         return self.validation_history
     
     def export_history(self, filepath: str):
-        """Export validation history to JSON"""
-        with open(filepath, 'w') as f:
-            json.dump(self.validation_history, f, indent=2)
+        """
+        Export this agent's validation history to JSON (atomic replace)
+        Also fsyncs the append-only log when one is open
+        """
+        log_paths = {
+            os.path.abspath(p) for p in (HISTORY_LOG_PATH, self.history_log_path)
+            if p is not None
+        }
+        if os.path.abspath(filepath) in log_paths:
+            raise ValueError(f"Refusing to overwrite the history log: {filepath}")
+        
+        if self._hist_fp:
+            os.fsync(self._hist_fp.fileno())
+        
+        tmp_path = f"{filepath}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(self.validation_history, option=orjson.OPT_INDENT_2))
+        os.replace(tmp_path, filepath)
         print(f"📁 History exported to {filepath}")
 
 
@@ -356,4 +807,9 @@ async def main():
 
 
 if __name__ == "__main__":
+    try:
+        import uvloop  # Not available on Windows
+        uvloop.install()
+    except ImportError:
+        pass
     asyncio.run(main())
\ No newline at end of file